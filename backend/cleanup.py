@@ -16,6 +16,7 @@ load_dotenv()
 # Configuration
 STORAGE_DIR = os.environ.get('STORAGE_DIR', '/var/www/larynx/backend/storage')
 AUTO_CLEANUP_HOURS = int(os.environ.get('AUTO_CLEANUP_HOURS', 48))
+TTS_CACHE_TTL_HOURS = int(os.environ.get('TTS_CACHE_TTL_HOURS', 168))
 
 def cleanup_old_files():
     """Delete audio files older than AUTO_CLEANUP_HOURS."""
@@ -48,6 +49,20 @@ def cleanup_old_files():
         except Exception as e:
             print(f"  Error deleting {file_path.name}: {e}")
     
+    # Cached TTS audio uses its own TTL (mtime is refreshed on every cache hit)
+    cache_cutoff_time = time.time() - (TTS_CACHE_TTL_HOURS * 3600)
+    for file_path in (storage_path / 'cache').glob('*.mp3'):
+        try:
+            file_stat = file_path.stat()
+            if file_stat.st_mtime < cache_cutoff_time:
+                file_size = file_stat.st_size
+                file_path.unlink()
+                deleted_count += 1
+                deleted_size += file_size
+                print(f"  Deleted cached: {file_path.name}")
+        except Exception as e:
+            print(f"  Error deleting {file_path.name}: {e}")
+    
     size_mb = deleted_size / (1024 * 1024)
     print(f"\nCleanup complete: {deleted_count} files deleted ({size_mb:.2f} MB freed)")
 
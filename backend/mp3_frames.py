@@ -0,0 +1,203 @@
+"""
+Larynx TTS - MPEG audio frame parsing
+Reads MP3 frame headers (and ID3v2 / Xing / Info / VBRI tags) to get durations
+and frame ranges without decoding. Dependency-free, shared by server.py and test_core.py.
+"""
+
+import os
+from typing import Optional
+
+
+# MPEG audio frame header tables, indexed by [version][layer]
+# (version: 1 = MPEG-1, 2 = MPEG-2/2.5; layer: 1-3)
+MPEG_BITRATES = {
+    1: {
+        1: [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+        2: [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+        3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    },
+    2: {
+        1: [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+        2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+        3: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    },
+}
+MPEG_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],   # MPEG-2.5
+}
+
+
+def id3v2_size(data: bytes) -> int:
+    """Return the total size of a leading ID3v2 tag (0 if there is none)."""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    # Tag size is a 28-bit syncsafe integer, excluding the 10-byte header (and optional footer)
+    size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def parse_mpeg_frame_header(data: bytes, pos: int) -> Optional[dict]:
+    """
+    Decode the 4-byte MPEG audio frame header at pos.
+    Returns None if the bytes are not a valid frame header.
+    """
+    if pos + 4 > len(data) or data[pos] != 0xFF or (data[pos + 1] & 0xE0) != 0xE0:
+        return None
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    version_bits = (b1 >> 3) & 0x03
+    layer = 4 - ((b1 >> 1) & 0x03)
+    bitrate_index = b2 >> 4
+    sample_rate_index = (b2 >> 2) & 0x03
+    if version_bits == 1 or layer == 4 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    
+    version = 1 if version_bits == 3 else 2
+    bitrate = MPEG_BITRATES[version][layer][bitrate_index] * 1000
+    sample_rate = MPEG_SAMPLE_RATES[version_bits][sample_rate_index]
+    padding = (b2 >> 1) & 0x01
+    channel_mode = b3 >> 6
+    
+    if layer == 1:
+        samples = 384
+        frame_length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 2 or version == 1:
+        samples = 1152
+        frame_length = 144 * bitrate // sample_rate + padding
+    else:
+        samples = 576
+        frame_length = 72 * bitrate // sample_rate + padding
+    
+    return {
+        "version": version_bits,
+        "layer": layer,
+        "bitrate": bitrate,
+        "sample_rate": sample_rate,
+        "channel_mode": channel_mode,
+        "samples": samples,
+        "frame_length": frame_length,
+    }
+
+
+def xing_tag_offset(header: dict) -> int:
+    """Offset of a Xing/Info tag from the start of its frame (after header + side info)."""
+    mono = header["channel_mode"] == 3
+    if header["version"] == 3:
+        side_info = 17 if mono else 32
+    else:
+        side_info = 9 if mono else 17
+    return 4 + side_info
+
+
+def is_vbr_info_frame(data: bytes, pos: int, header: dict) -> bool:
+    """Check whether the frame at pos carries a Xing/Info or VBRI tag instead of audio."""
+    tag_pos = pos + xing_tag_offset(header)
+    return data[tag_pos:tag_pos + 4] in (b"Xing", b"Info") or data[pos + 36:pos + 40] == b"VBRI"
+
+
+def mp3_duration_seconds(path: str) -> Optional[float]:
+    """
+    Get an MP3 file's duration from its frame headers, without decoding.
+    Uses the Xing/Info or VBRI frame count when present, otherwise assumes CBR.
+    Returns None if no MPEG audio frame is found.
+    """
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        audio_start = id3v2_size(f.read(10))
+        f.seek(audio_start)
+        data = f.read(4096)
+        has_id3v1 = False
+        if file_size - audio_start >= 128:
+            f.seek(-128, os.SEEK_END)
+            has_id3v1 = f.read(3) == b"TAG"
+    
+    # Find the first frame header that is followed by another valid header (or the end of the read)
+    header = None
+    pos = 0
+    while pos + 4 <= len(data):
+        header = parse_mpeg_frame_header(data, pos)
+        if header:
+            next_pos = pos + header["frame_length"]
+            if next_pos + 4 > len(data) or parse_mpeg_frame_header(data, next_pos):
+                break
+        header = None
+        pos += 1
+    if header is None:
+        return None
+    
+    # VBR/Info tags carry the exact frame count
+    frames = None
+    tag_pos = pos + xing_tag_offset(header)
+    if data[tag_pos:tag_pos + 4] in (b"Xing", b"Info"):
+        flags = int.from_bytes(data[tag_pos + 4:tag_pos + 8], "big")
+        if flags & 0x01:
+            frames = int.from_bytes(data[tag_pos + 8:tag_pos + 12], "big")
+    elif data[pos + 36:pos + 40] == b"VBRI":
+        frames = int.from_bytes(data[pos + 50:pos + 54], "big")
+    if frames:
+        return frames * header["samples"] / header["sample_rate"]
+    
+    # CBR: duration follows from the audio byte count and bitrate
+    audio_bytes = file_size - audio_start - pos - (128 if has_id3v1 else 0)
+    return audio_bytes * 8 / header["bitrate"]
+
+
+def scan_mp3_frames(data: bytes) -> Optional[dict]:
+    """
+    Walk the MPEG audio frames of an MP3 blob without decoding.
+    Returns the audio byte range (ID3 tags and Xing/Info frames excluded), frame count,
+    stream format and duration, or None if no audio frames are found or the frames
+    don't run cleanly to the end of the data (apart from a trailing ID3v1 tag).
+    """
+    pos = id3v2_size(data)
+    n = len(data)
+    
+    # Find the first frame header that is followed by another valid header (or EOF)
+    first = None
+    while pos + 4 <= n:
+        first = parse_mpeg_frame_header(data, pos)
+        if first:
+            next_pos = pos + first["frame_length"]
+            if next_pos >= n or parse_mpeg_frame_header(data, next_pos):
+                break
+        first = None
+        pos += 1
+    if first is None:
+        return None
+    
+    if is_vbr_info_frame(data, pos, first):
+        # The Info frame's header can differ from the audio's (LAME writes stereo over joint stereo)
+        pos += first["frame_length"]
+        first = parse_mpeg_frame_header(data, pos)
+        if first is None:
+            return None
+    
+    mono = first["channel_mode"] == 3
+    start = pos
+    frames = 0
+    bitrates = set()
+    while pos + 4 <= n:
+        header = parse_mpeg_frame_header(data, pos)
+        if (not header or header["sample_rate"] != first["sample_rate"]
+                or (header["channel_mode"] == 3) != mono
+                or pos + header["frame_length"] > n):
+            break
+        bitrates.add(header["bitrate"])
+        frames += 1
+        pos += header["frame_length"]
+    if frames == 0:
+        return None
+    # A bad or unsynced frame mid-stream would otherwise silently truncate the chunk
+    if pos != n and not (n - pos == 128 and data[pos:pos + 3] == b"TAG"):
+        return None
+    
+    return {
+        "start": start,
+        "end": pos,
+        "frames": frames,
+        "format": (first["version"], first["layer"], first["sample_rate"], mono,
+                   bitrates.pop() if len(bitrates) == 1 else None),
+        "duration": frames * first["samples"] / first["sample_rate"],
+    }
@@ -4,10 +4,16 @@ FastAPI server for processing long texts into speech using ElevenLabs API
 """
 
 import os
+import stat
 import re
+import copy
 import json
+import time
+import hashlib
 import asyncio
+import queue
 import httpx
+import orjson
 import subprocess
 import tempfile
 from io import BytesIO
@@ -21,14 +27,16 @@ from dotenv import load_dotenv
 ENV_PATH = Path(__file__).resolve().parent / ".env"
 load_dotenv(dotenv_path=ENV_PATH)
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, StreamingResponse, ORJSONResponse as _ORJSONResponse
 from pydantic import BaseModel, Field
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
 from bson import ObjectId
 from elevenlabs import ElevenLabs
 from elevenlabs.types import PronunciationDictionaryVersionLocator
+from mp3_frames import id3v2_size, mp3_duration_seconds, scan_mp3_frames
 
 # Google Drive imports
 from google.oauth2 import service_account
@@ -67,27 +75,113 @@ MIN_CHUNK_SIZE = 500
 MAX_CHUNK_SIZE = 20000
 MAX_RETRIES = 3  # Number of retries for failed API calls
 RETRY_DELAYS = [5, 15, 30]  # Seconds to wait between retries (exponential backoff)
-
-# Ensure storage directory exists
+AUDIO_BUFFER_SIZE = int(os.environ.get("AUDIO_BUFFER_SIZE", 256 * 1024))  # Initial size of pooled TTS buffers (bytes)
+AUDIO_BUFFER_POOL_SIZE = int(os.environ.get("AUDIO_BUFFER_POOL_SIZE", 8))  # Max idle buffers kept for reuse
+TTS_CONCURRENCY = int(os.environ.get("TTS_CONCURRENCY", 4))  # Max ElevenLabs requests in flight for the whole server (all workers, all jobs)
+TTS_CACHE_TTL_HOURS = int(os.environ.get("TTS_CACHE_TTL_HOURS", 168))  # Reuse identical TTS audio for this long (0 disables)
+ELEVENLABS_API_BASE = "https://api.elevenlabs.io"
+PROGRESS_FLUSH_BATCH = 8  # Flush batched chunk progress writes after this many updates...
+PROGRESS_FLUSH_INTERVAL = 0.1  # ...or after this many seconds
+SETTINGS_CACHE_TTL = float(os.environ.get("SETTINGS_CACHE_TTL", 10))  # Seconds before cached settings are re-read (bounds staleness across workers)
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", min(2 * (os.cpu_count() or 1), 8, TTS_CONCURRENCY)))  # Uvicorn worker processes
+# TTS_CONCURRENCY split across workers; the real ceiling is TTS_WORKER_CONCURRENCY x WEB_CONCURRENCY,
+# which exceeds TTS_CONCURRENCY only if WEB_CONCURRENCY is set above it
+TTS_WORKER_CONCURRENCY = max(1, TTS_CONCURRENCY // WEB_CONCURRENCY)
+
+# Sentence boundaries (. ! ? followed by whitespace) and filename sanitizing
+_SENT_SPLIT = re.compile(r'(?<=[.!?])\s+')
+_SAFE_NAME_RE = re.compile(r'[^a-zA-Z0-9_-]')
+
+# Ensure storage directories exist
+TTS_CACHE_DIR = os.path.join(STORAGE_DIR, "cache")
 os.makedirs(STORAGE_DIR, exist_ok=True)
+os.makedirs(TTS_CACHE_DIR, exist_ok=True)
 
 # MongoDB client
 client: AsyncIOMotorClient = None
 db = None
 
+# Shared HTTP client for ElevenLabs streaming TTS (reuses HTTP/2 connections)
+http_client: httpx.AsyncClient = None
+
+# Caps concurrent ElevenLabs requests across every job in this process (created in lifespan)
+tts_semaphore: asyncio.Semaphore = None
+
+# Shared keep-alive client for webhook delivery, and in-flight webhook tasks
+webhook_client: httpx.AsyncClient = None
+_webhook_tasks: set = set()
+
+# Reusable buffers for collecting TTS audio
+_AUDIO_BUF_POOL: "queue.LifoQueue[bytearray]" = queue.LifoQueue(maxsize=AUDIO_BUFFER_POOL_SIZE)
+
+
+def acquire_audio_buffer() -> bytearray:
+    """Take an idle audio buffer from the pool, or allocate a new one."""
+    try:
+        return _AUDIO_BUF_POOL.get_nowait()
+    except queue.Empty:
+        return bytearray(AUDIO_BUFFER_SIZE)
+
+
+def release_audio_buffer(buf: bytearray) -> None:
+    """Return an audio buffer to the pool (dropped if the pool is full)."""
+    try:
+        _AUDIO_BUF_POOL.put_nowait(buf)
+    except queue.Full:
+        pass
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events."""
-    global client, db
+    global client, db, http_client, webhook_client, tts_semaphore
     client = AsyncIOMotorClient(MONGO_URL)
     db = client[DB_NAME]
     print(f"Connected to MongoDB: {DB_NAME}")
+    await db.jobs.create_index([("created_at", -1), ("status", 1)])
+    await db.job_chunks.create_index([("job_id", 1), ("chunk_index", 1)], unique=True)
+    await db.tts_cache.create_index("key", unique=True)
+    if TTS_CACHE_TTL_HOURS > 0:
+        await db.tts_cache.create_index("last_used", expireAfterSeconds=TTS_CACHE_TTL_HOURS * 3600)
+    tts_semaphore = asyncio.Semaphore(TTS_WORKER_CONCURRENCY)
+    http_client = httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(300.0, connect=10.0),
+        limits=httpx.Limits(max_connections=max(TTS_WORKER_CONCURRENCY * 2, 10))
+    )
+    webhook_client = httpx.AsyncClient(
+        timeout=10.0,
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=16)
+    )
     yield
+    # Let in-flight webhooks finish before closing their client
+    if _webhook_tasks:
+        await asyncio.gather(*_webhook_tasks, return_exceptions=True)
+    await webhook_client.aclose()
+    await http_client.aclose()
     client.close()
 
 
-app = FastAPI(title="TTS Chunker API", lifespan=lifespan)
+def orjson_default(obj):
+    """Encode types orjson doesn't handle natively."""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError
+
+
+class ORJSONResponse(_ORJSONResponse):
+    """JSON response rendered with orjson (also encodes ObjectId)."""
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class AudioFileResponse(FileResponse):
+    """File response that reads audio in larger blocks than Starlette's 64KB default."""
+    chunk_size = 1024 * 1024
+
+
+app = FastAPI(title="TTS Chunker API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # CORS
 app.add_middleware(
@@ -167,6 +261,23 @@ class TTSSettingsUpdate(BaseModel):
     studio_settings: Optional[StudioSettings] = None
 
 
+# Fields returned by the job list and job status views
+JOB_LIST_PROJECTION = {
+    "name": 1,
+    "status": 1,
+    "stage": 1,
+    "progress": 1,
+    "chunk_count": 1,
+    "processed_chunks": 1,
+    "text_length": 1,
+    "error": 1,
+    "audio_url": 1,
+    "duration_seconds": 1,
+    "created_at": 1,
+    "updated_at": 1
+}
+
+
 # Default TTS settings
 DEFAULT_TTS_SETTINGS = {
     "mode": "chunking",
@@ -216,7 +327,159 @@ async def get_tts_settings():
         # Remove MongoDB _id from result
         del settings_doc["_id"]
         return settings_doc
-    return DEFAULT_TTS_SETTINGS.copy()
+    return copy.deepcopy(DEFAULT_TTS_SETTINGS)
+
+
+# In-memory copy of the settings document (invalidated on update/reset)
+_SETTINGS_CACHE: Optional[dict] = None
+_SETTINGS_CACHED_AT = 0.0
+_SETTINGS_LOCK = asyncio.Lock()
+
+
+async def get_tts_settings_cached() -> dict:
+    """Get current TTS settings, served from memory when fresh. Returns a copy safe to modify."""
+    global _SETTINGS_CACHE, _SETTINGS_CACHED_AT
+    if _SETTINGS_CACHE is None or time.monotonic() - _SETTINGS_CACHED_AT > SETTINGS_CACHE_TTL:
+        async with _SETTINGS_LOCK:
+            if _SETTINGS_CACHE is None or time.monotonic() - _SETTINGS_CACHED_AT > SETTINGS_CACHE_TTL:
+                set_settings_cache(await get_tts_settings())
+    return copy.deepcopy(_SETTINGS_CACHE)
+
+
+def set_settings_cache(settings: Optional[dict]):
+    """Replace the cached settings (None forces a reload on next access)."""
+    global _SETTINGS_CACHE, _SETTINGS_CACHED_AT
+    _SETTINGS_CACHE = copy.deepcopy(settings)
+    _SETTINGS_CACHED_AT = time.monotonic()
+
+
+def job_oid(job_id: str) -> ObjectId:
+    """Path dependency: validate a job ID and convert it to an ObjectId."""
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job ID")
+    return ObjectId(job_id)
+
+
+async def get_chunk_requests(job: dict) -> list[dict]:
+    """
+    Get a job's chunk requests in order.
+    Legacy jobs with an embedded chunk_requests list are moved into job_chunks on first read,
+    so later per-chunk status writes land on real documents.
+    """
+    if "chunk_requests" in job:
+        chunk_requests = [dict(cr, chunk_index=i) for i, cr in enumerate(job["chunk_requests"])]
+        if chunk_requests:
+            # Upserts keep this idempotent if two requests migrate the same job at once
+            await db.job_chunks.bulk_write([
+                UpdateOne({"job_id": job["_id"], "chunk_index": cr["chunk_index"]}, {"$setOnInsert": {k: v for k, v in cr.items() if k != "chunk_index"}}, upsert=True)
+                for cr in chunk_requests
+            ], ordered=False)
+        await db.jobs.update_one({"_id": job["_id"]}, {"$unset": {"chunk_requests": ""}})
+        del job["chunk_requests"]
+        return chunk_requests
+    cursor = db.job_chunks.find({"job_id": job["_id"]}, {"_id": 0, "job_id": 0}).sort("chunk_index", 1)
+    return await cursor.to_list(length=None)
+
+
+def remove_if_exists(path: str):
+    """Delete a file, ignoring it if it is already gone."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def remove_quietly(path: str):
+    """Delete a file, ignoring any error (used for best-effort cleanup)."""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def stat_regular_file(path: str) -> Optional[os.stat_result]:
+    """Stat a path, returning None unless it is an existing regular file."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st if stat.S_ISREG(st.st_mode) else None
+
+
+async def update_job_chunk(job_id: str, chunk_index: int, fields: dict):
+    """Set fields on a single chunk request document."""
+    await db.job_chunks.update_one(
+        {"job_id": ObjectId(job_id), "chunk_index": chunk_index},
+        {"$set": fields}
+    )
+
+
+def tts_cache_key(text: str, settings: dict) -> str:
+    """Content-addressed cache key for a TTS request (text + voice + model + settings)."""
+    options = {
+        "output_format": settings.get("output_format", "mp3_44100_128"),
+        "voice_settings": settings.get("voice_settings", {}),
+        "pronunciation_dictionary": settings.get("pronunciation_dictionary"),
+    }
+    return hashlib.blake2b(b"|".join([
+        text.encode(),
+        settings.get("voice_id", ELEVENLABS_VOICE_ID).encode(),
+        settings.get("model_id", ELEVENLABS_MODEL).encode(),
+        json.dumps(options, sort_keys=True).encode()
+    ]), digest_size=16).hexdigest()
+
+
+def read_tts_cache_file(key: str) -> Optional[bytes]:
+    """Read cached MP3 bytes for a key, or None if not cached."""
+    path = os.path.join(TTS_CACHE_DIR, f"{key}.mp3")
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    # Refresh mtime so cleanup.py treats the entry as recently used
+    os.utime(path)
+    return data
+
+
+def write_tts_cache_file(key: str, data: bytes) -> None:
+    """Atomically write MP3 bytes to the cache."""
+    fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=TTS_CACHE_DIR)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, os.path.join(TTS_CACHE_DIR, f"{key}.mp3"))
+    except:
+        os.unlink(tmp_path)
+        raise
+
+
+async def get_cached_tts_audio(key: str) -> Optional[bytes]:
+    """Look up cached TTS audio, bumping its last_used timestamp on a hit."""
+    if TTS_CACHE_TTL_HOURS <= 0:
+        return None
+    entry = await db.tts_cache.find_one_and_update(
+        {"key": key},
+        {"$inc": {"hits": 1}, "$currentDate": {"last_used": True}}
+    )
+    if not entry:
+        return None
+    return await asyncio.to_thread(read_tts_cache_file, key)
+
+
+async def store_cached_tts_audio(key: str, data: bytes) -> None:
+    """Store TTS audio in the cache. Failures are logged, never raised."""
+    if TTS_CACHE_TTL_HOURS <= 0:
+        return
+    try:
+        await asyncio.to_thread(write_tts_cache_file, key, data)
+        await db.tts_cache.update_one(
+            {"key": key},
+            {"$set": {"size": len(data)}, "$setOnInsert": {"hits": 0}, "$currentDate": {"last_used": True}},
+            upsert=True
+        )
+    except Exception as e:
+        print(f"TTS cache write error: {e}")
 
 
 def split_text_into_chunks(text: str, max_chars: int = DEFAULT_CHUNK_SIZE) -> list[str]:
@@ -225,11 +488,12 @@ def split_text_into_chunks(text: str, max_chars: int = DEFAULT_CHUNK_SIZE) -> li
     Sentence boundaries: . ! ? followed by space or newline
     """
     # Split on sentence boundaries but keep the delimiter
-    sentence_pattern = r'(?<=[.!?])\s+'
-    sentences = re.split(sentence_pattern, text)
+    sentences = _SENT_SPLIT.split(text)
     
     chunks = []
-    current_chunk = ""
+    # Build each chunk as a list of parts plus a running length; join once on flush
+    cur_parts: list[str] = []
+    cur_len = 0
     
     for sentence in sentences:
         sentence = sentence.strip()
@@ -237,33 +501,34 @@ def split_text_into_chunks(text: str, max_chars: int = DEFAULT_CHUNK_SIZE) -> li
             continue
             
         # If adding this sentence exceeds max, save current chunk and start new
-        if len(current_chunk) + len(sentence) + 1 > max_chars:
-            if current_chunk:
-                chunks.append(current_chunk.strip())
+        if cur_len + len(sentence) + 1 > max_chars:
+            if cur_parts:
+                chunks.append(" ".join(cur_parts))
             
             # If a single sentence exceeds max_chars, we need to split it
             if len(sentence) > max_chars:
                 # Split at word boundaries
-                words = sentence.split()
-                current_chunk = ""
-                for word in words:
-                    if len(current_chunk) + len(word) + 1 > max_chars:
-                        if current_chunk:
-                            chunks.append(current_chunk.strip())
-                        current_chunk = word
+                cur_parts = []
+                cur_len = 0
+                for word in sentence.split():
+                    if cur_len + len(word) + 1 > max_chars:
+                        if cur_parts:
+                            chunks.append(" ".join(cur_parts))
+                        cur_parts = [word]
+                        cur_len = len(word)
                     else:
-                        current_chunk = f"{current_chunk} {word}".strip()
+                        cur_len += len(word) + (1 if cur_parts else 0)
+                        cur_parts.append(word)
             else:
-                current_chunk = sentence
+                cur_parts = [sentence]
+                cur_len = len(sentence)
         else:
-            if current_chunk:
-                current_chunk = f"{current_chunk} {sentence}"
-            else:
-                current_chunk = sentence
+            cur_len += len(sentence) + (1 if cur_parts else 0)
+            cur_parts.append(sentence)
     
     # Don't forget the last chunk
-    if current_chunk:
-        chunks.append(current_chunk.strip())
+    if cur_parts:
+        chunks.append(" ".join(cur_parts))
     
     return chunks
 
@@ -303,51 +568,78 @@ async def tts_chunk_to_audio(client: ElevenLabs, text: str, settings: dict) -> b
     )
     
     # Collect all audio bytes from generator
-    audio_data = b""
+    parts: list[bytes] = []
     for chunk in audio_generator:
-        audio_data += chunk
+        parts.append(chunk)
     
-    return audio_data
+    return b"".join(parts)
 
 
-def merge_audio_chunks(audio_chunks: list[bytes]) -> tuple[bytes, float]:
+def concat_mp3(audio_chunks: list[bytes], output_path: str) -> Optional[float]:
     """
-    Merge multiple MP3 audio chunks into a single MP3 file using ffmpeg directly.
-    Returns (merged_bytes, duration_seconds)
+    Merge MP3 chunks by writing their MPEG frames straight to output_path (no decode or re-encode).
+    Keeps the first chunk's ID3v2 tag and drops per-chunk ID3/Xing headers.
+    Returns duration_seconds, or None (nothing written) if the chunks do not share
+    one constant-bitrate format and need a full ffmpeg merge instead.
+    """
+    frame_infos = [scan_mp3_frames(chunk) for chunk in audio_chunks]
+    if any(info is None for info in frame_infos):
+        return None
+    formats = {info["format"] for info in frame_infos}
+    if len(formats) != 1 or next(iter(formats))[4] is None:
+        return None
+    
+    with open(output_path, "wb") as f:
+        f.write(memoryview(audio_chunks[0])[:id3v2_size(audio_chunks[0])])
+        for chunk, info in zip(audio_chunks, frame_infos):
+            f.write(memoryview(chunk)[info["start"]:info["end"]])
+    
+    return sum(info["duration"] for info in frame_infos)
+
+
+def ffmpeg_duration(path: str) -> float:
+    """Get audio duration by decoding the file with ffmpeg."""
+    result = subprocess.run(
+        [FFMPEG_PATH, '-i', path, '-f', 'null', '-'],
+        capture_output=True,
+        text=True
+    )
+    # Parse duration from stderr (ffmpeg outputs info there)
+    for line in result.stderr.split('\n'):
+        if 'Duration:' in line:
+            time_str = line.split('Duration:')[1].split(',')[0].strip()
+            parts = time_str.split(':')
+            if len(parts) == 3:
+                h, m, s = parts
+                return float(h) * 3600 + float(m) * 60 + float(s)
+            break
+    return 0.0
+
+
+def merge_audio_chunks(audio_chunks: list[bytes], output_path: str) -> float:
+    """
+    Merge multiple MP3 audio chunks into a single MP3 file at output_path.
+    Uses frame-level concatenation when all chunks share a CBR format,
+    otherwise falls back to ffmpeg.
+    Returns duration_seconds
     """
     if not audio_chunks:
         raise ValueError("No audio chunks to merge")
     
-    # If only one chunk, return it directly
+    duration = concat_mp3(audio_chunks, output_path)
+    if duration is not None:
+        return duration
+    
+    # If only one chunk, write it directly
     if len(audio_chunks) == 1:
-        # Get duration using ffmpeg
-        with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as tmp:
-            tmp.write(audio_chunks[0])
-            tmp_path = tmp.name
-        
-        try:
-            # Get duration using ffmpeg
-            result = subprocess.run(
-                [FFMPEG_PATH, '-i', tmp_path, '-f', 'null', '-'],
-                capture_output=True,
-                text=True
-            )
-            # Parse duration from stderr (ffmpeg outputs info there)
-            duration = 0.0
-            for line in result.stderr.split('\n'):
-                if 'Duration:' in line:
-                    time_str = line.split('Duration:')[1].split(',')[0].strip()
-                    parts = time_str.split(':')
-                    if len(parts) == 3:
-                        h, m, s = parts
-                        duration = float(h) * 3600 + float(m) * 60 + float(s)
-                    break
-            return audio_chunks[0], duration
-        finally:
-            os.unlink(tmp_path)
+        with open(output_path, "wb") as f:
+            f.write(audio_chunks[0])
+        duration = mp3_duration_seconds(output_path)
+        return duration if duration is not None else ffmpeg_duration(output_path)
     
     # Multiple chunks - create temp files and merge
     temp_files = []
+    concat_file = None
     try:
         # Write all chunks to temp files
         for i, chunk in enumerate(audio_chunks):
@@ -362,11 +654,7 @@ def merge_audio_chunks(audio_chunks: list[bytes]) -> tuple[bytes, float]:
             concat_file.write(f"file '{f}'\n")
         concat_file.close()
         
-        # Output file
-        output_file = tempfile.NamedTemporaryFile(suffix='.mp3', delete=False)
-        output_file.close()
-        
-        # Run ffmpeg concat
+        # Run ffmpeg concat straight into the output file
         result = subprocess.run(
             [
                 FFMPEG_PATH,
@@ -375,7 +663,7 @@ def merge_audio_chunks(audio_chunks: list[bytes]) -> tuple[bytes, float]:
                 '-i', concat_file.name,
                 '-c', 'copy',
                 '-y',
-                output_file.name
+                output_path
             ],
             capture_output=True,
             text=True
@@ -384,34 +672,14 @@ def merge_audio_chunks(audio_chunks: list[bytes]) -> tuple[bytes, float]:
         if result.returncode != 0:
             raise RuntimeError(f"ffmpeg merge failed: {result.stderr}")
         
-        # Read merged file
-        with open(output_file.name, 'rb') as f:
-            merged_data = f.read()
-        
-        # Get duration from the merged file
-        result = subprocess.run(
-            [FFMPEG_PATH, '-i', output_file.name, '-f', 'null', '-'],
-            capture_output=True,
-            text=True
-        )
-        duration = 0.0
-        for line in result.stderr.split('\n'):
-            if 'Duration:' in line:
-                time_str = line.split('Duration:')[1].split(',')[0].strip()
-                parts = time_str.split(':')
-                if len(parts) == 3:
-                    h, m, s = parts
-                    duration = float(h) * 3600 + float(m) * 60 + float(s)
-                break
-        
-        # Clean up
-        os.unlink(concat_file.name)
-        os.unlink(output_file.name)
-        
-        return merged_data, duration
+        # ffmpeg writes a Xing header, so the frame count is exact even for mixed bitrates
+        duration = mp3_duration_seconds(output_path)
+        return duration if duration is not None else ffmpeg_duration(output_path)
         
     finally:
         # Clean up temp files
+        if concat_file:
+            temp_files.append(concat_file.name)
         for f in temp_files:
             try:
                 os.unlink(f)
@@ -448,15 +716,21 @@ async def send_webhook(job_id: str, name: str, audio_url: str, status: str, text
         payload["googleDriveFileId"] = google_drive_file_id
     
     try:
-        async with httpx.AsyncClient() as http_client:
-            response = await http_client.post(WEBHOOK_URL, json=payload, timeout=10.0)
-            print(f"Webhook sent: {response.status_code}")
-            return response.status_code in (200, 201, 202, 204)
+        response = await webhook_client.post(WEBHOOK_URL, json=payload)
+        print(f"Webhook sent: {response.status_code}")
+        return response.status_code in (200, 201, 202, 204)
     except Exception as e:
         print(f"Webhook error: {e}")
         return False
 
 
+def schedule_webhook(**kwargs):
+    """Send a webhook in the background so job completion doesn't wait on delivery."""
+    task = asyncio.create_task(send_webhook(**kwargs))
+    _webhook_tasks.add(task)
+    task.add_done_callback(_webhook_tasks.discard)
+
+
 def upload_to_google_drive(file_path: str, folder_id: str, file_name: str) -> dict:
     """
     Upload a file to Google Drive folder (supports Shared Drives).
@@ -523,7 +797,7 @@ async def process_studio_job(job_id: str):
         # Update status
         await db.jobs.update_one(
             {"_id": ObjectId(job_id)},
-            {"$set": {"status": "processing", "stage": "Creating Studio project...", "progress": 10, "updated_at": datetime.utcnow()}}
+            {"$set": {"status": "processing", "stage": "Creating Studio project...", "progress": 10}, "$currentDate": {"updated_at": True}}
         )
         
         # Prepare the content JSON for Studio API
@@ -598,7 +872,7 @@ async def process_studio_job(job_id: str):
                 print(error_msg)
                 await db.jobs.update_one(
                     {"_id": ObjectId(job_id)},
-                    {"$set": {"status": "failed", "error": error_msg, "updated_at": datetime.utcnow()}}
+                    {"$set": {"status": "failed", "error": error_msg}, "$currentDate": {"updated_at": True}}
                 )
                 return
             
@@ -610,7 +884,7 @@ async def process_studio_job(job_id: str):
                 print(error_msg)
                 await db.jobs.update_one(
                     {"_id": ObjectId(job_id)},
-                    {"$set": {"status": "failed", "error": error_msg, "updated_at": datetime.utcnow()}}
+                    {"$set": {"status": "failed", "error": error_msg}, "$currentDate": {"updated_at": True}}
                 )
                 return
             
@@ -622,9 +896,8 @@ async def process_studio_job(job_id: str):
                 {"$set": {
                     "studio_project_id": project_id,
                     "stage": "Converting audio...",
-                    "progress": 30,
-                    "updated_at": datetime.utcnow()
-                }}
+                    "progress": 30
+                }, "$currentDate": {"updated_at": True}}
             )
             
             # Poll for project conversion status
@@ -654,9 +927,8 @@ async def process_studio_job(job_id: str):
                     {"_id": ObjectId(job_id)},
                     {"$set": {
                         "stage": f"Converting audio... ({state})",
-                        "progress": progress,
-                        "updated_at": datetime.utcnow()
-                    }}
+                        "progress": progress
+                    }, "$currentDate": {"updated_at": True}}
                 )
                 
                 if state == "ready":
@@ -678,7 +950,7 @@ async def process_studio_job(job_id: str):
                     print(error_msg)
                     await db.jobs.update_one(
                         {"_id": ObjectId(job_id)},
-                        {"$set": {"status": "failed", "error": error_msg, "updated_at": datetime.utcnow()}}
+                        {"$set": {"status": "failed", "error": error_msg}, "$currentDate": {"updated_at": True}}
                     )
                     return
             
@@ -687,7 +959,7 @@ async def process_studio_job(job_id: str):
                 print(error_msg)
                 await db.jobs.update_one(
                     {"_id": ObjectId(job_id)},
-                    {"$set": {"status": "failed", "error": error_msg, "updated_at": datetime.utcnow()}}
+                    {"$set": {"status": "failed", "error": error_msg}, "$currentDate": {"updated_at": True}}
                 )
                 return
             
@@ -699,9 +971,8 @@ async def process_studio_job(job_id: str):
                 {"$set": {
                     "studio_snapshot_id": project_snapshot_id,
                     "stage": "Downloading audio...",
-                    "progress": 85,
-                    "updated_at": datetime.utcnow()
-                }}
+                    "progress": 85
+                }, "$currentDate": {"updated_at": True}}
             )
             
             # Download the audio
@@ -715,7 +986,7 @@ async def process_studio_job(job_id: str):
                 print(error_msg)
                 await db.jobs.update_one(
                     {"_id": ObjectId(job_id)},
-                    {"$set": {"status": "failed", "error": error_msg, "updated_at": datetime.utcnow()}}
+                    {"$set": {"status": "failed", "error": error_msg}, "$currentDate": {"updated_at": True}}
                 )
                 return
             
@@ -724,16 +995,18 @@ async def process_studio_job(job_id: str):
             with open(audio_path, "wb") as f:
                 f.write(audio_response.content)
             
-            # Get audio duration using ffprobe
+            # Get audio duration from the MP3 headers, falling back to ffprobe
             duration = None
             try:
-                result = subprocess.run(
-                    [FFMPEG_PATH.replace('ffmpeg', 'ffprobe'), '-v', 'quiet', '-show_entries', 
-                     'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', audio_path],
-                    capture_output=True, text=True
-                )
-                if result.returncode == 0:
-                    duration = float(result.stdout.strip())
+                duration = mp3_duration_seconds(audio_path)
+                if duration is None:
+                    result = subprocess.run(
+                        [FFMPEG_PATH.replace('ffmpeg', 'ffprobe'), '-v', 'quiet', '-show_entries', 
+                         'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', audio_path],
+                        capture_output=True, text=True
+                    )
+                    if result.returncode == 0:
+                        duration = float(result.stdout.strip())
             except:
                 pass
             
@@ -765,16 +1038,15 @@ async def process_studio_job(job_id: str):
                     "audio_url": audio_url,
                     "duration_seconds": duration,
                     "google_drive_url": google_drive_url,
-                    "google_drive_file_id": google_drive_file_id,
-                    "updated_at": datetime.utcnow()
-                }}
+                    "google_drive_file_id": google_drive_file_id
+                }, "$currentDate": {"updated_at": True}}
             )
             
             print(f"Studio job {job_id} completed. Duration: {duration}s")
             
             # Send webhook notification
             if WEBHOOK_URL:
-                await send_webhook(
+                schedule_webhook(
                     job_id=job_id,
                     name=job.get("name"),
                     audio_url=full_audio_url,
@@ -795,7 +1067,7 @@ async def process_studio_job(job_id: str):
         traceback.print_exc()
         await db.jobs.update_one(
             {"_id": ObjectId(job_id)},
-            {"$set": {"status": "failed", "error": error_msg, "updated_at": datetime.utcnow()}}
+            {"$set": {"status": "failed", "error": error_msg}, "$currentDate": {"updated_at": True}}
         )
 
 
@@ -814,99 +1086,35 @@ async def process_tts_job(job_id: str):
         # Update status to chunking
         await db.jobs.update_one(
             {"_id": ObjectId(job_id)},
-            {"$set": {"status": "chunking", "stage": "Analyzing text...", "updated_at": datetime.utcnow()}}
+            {"$set": {"status": "chunking", "stage": "Analyzing text..."}, "$currentDate": {"updated_at": True}}
         )
         
-        # Initialize ElevenLabs client
-        eleven_client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
-        
         # Get chunks
-        chunks = job["chunks"]
+        chunks = [cr["request"]["text"] for cr in await get_chunk_requests(job)]
         chunk_count = len(chunks)
-        audio_chunks = []
         
         # Update status to transcribing
         await db.jobs.update_one(
             {"_id": ObjectId(job_id)},
-            {"$set": {"status": "transcribing", "stage": f"Converting to speech (0/{chunk_count})...", "updated_at": datetime.utcnow()}}
+            {"$set": {"status": "transcribing", "stage": f"Converting to speech (0/{chunk_count})..."}, "$currentDate": {"updated_at": True}}
         )
         
-        # Process each chunk with retry logic
-        for i, chunk_text in enumerate(chunks):
-            print(f"Processing chunk {i + 1}/{chunk_count} for job {job_id}")
-            
-            # Update chunk status to processing
-            await db.jobs.update_one(
-                {"_id": ObjectId(job_id)},
-                {"$set": {
-                    f"chunk_requests.{i}.status": "processing",
-                    "updated_at": datetime.utcnow()
-                }}
-            )
-            
-            try:
-                # Use retry wrapper for resilience
-                audio_data = await tts_chunk_with_retry(eleven_client, chunk_text, tts_settings, i, job_id)
-                audio_chunks.append(audio_data)
-                
-                # Save individual chunk audio file
-                chunk_audio_path = os.path.join(STORAGE_DIR, f"{job_id}_chunk_{i}.mp3")
-                with open(chunk_audio_path, "wb") as f:
-                    f.write(audio_data)
-                
-                # Update progress and chunk request status
-                progress = int(((i + 1) / chunk_count) * 85)  # 85% for TTS, 15% for merge
-                await db.jobs.update_one(
-                    {"_id": ObjectId(job_id)},
-                    {
-                        "$set": {
-                            "processed_chunks": i + 1,
-                            "progress": progress,
-                            "stage": f"Converting to speech ({i + 1}/{chunk_count})...",
-                            "updated_at": datetime.utcnow(),
-                            f"chunk_requests.{i}.status": "completed",
-                            f"chunk_requests.{i}.processed_at": datetime.utcnow().isoformat(),
-                            f"chunk_requests.{i}.audio_path": chunk_audio_path,
-                            f"chunk_requests.{i}.audio_url": f"/api/jobs/{job_id}/chunks/{i}/audio"
-                        }
-                    }
-                )
-            except Exception as e:
-                # Mark chunk as failed after all retries exhausted
-                await db.jobs.update_one(
-                    {"_id": ObjectId(job_id)},
-                    {
-                        "$set": {
-                            f"chunk_requests.{i}.status": "failed",
-                            f"chunk_requests.{i}.error": str(e),
-                            f"chunk_requests.{i}.processed_at": datetime.utcnow().isoformat(),
-                            "failed_at_chunk": i  # Track where we failed for resume
-                        }
-                    }
-                )
-                print(f"Error processing chunk {i + 1} after {MAX_RETRIES} retries: {e}")
-                raise
+        # Convert all chunks in parallel (bounded), with retry logic per chunk
+        audio_chunks = await convert_chunks_concurrently(job_id, chunks, list(range(chunk_count)), tts_settings)
         
         # Merge audio chunks
         print(f"Merging {len(audio_chunks)} audio chunks for job {job_id}")
         await db.jobs.update_one(
             {"_id": ObjectId(job_id)},
-            {"$set": {"status": "merging", "stage": "Merging audio chunks...", "progress": 90, "updated_at": datetime.utcnow()}}
-        )
-        
-        merged_audio, duration = await asyncio.to_thread(
-            merge_audio_chunks, audio_chunks
-        )
-        
-        # Save to file
-        await db.jobs.update_one(
-            {"_id": ObjectId(job_id)},
-            {"$set": {"stage": "Saving audio file...", "progress": 95, "updated_at": datetime.utcnow()}}
+            {"$set": {"status": "merging", "stage": "Merging audio chunks...", "progress": 90}, "$currentDate": {"updated_at": True}}
         )
         
+        # Merge straight into the job's audio file
         audio_path = os.path.join(STORAGE_DIR, f"{job_id}.mp3")
-        with open(audio_path, "wb") as f:
-            f.write(merged_audio)
+        duration = await asyncio.to_thread(
+            merge_audio_chunks, audio_chunks, audio_path
+        )
+        audio_chunks.clear()
         
         # Upload to Google Drive if folder_id is provided
         google_drive_url = None
@@ -934,9 +1142,9 @@ async def process_tts_job(job_id: str):
                     "audio_url": audio_url,
                     "duration_seconds": duration,
                     "google_drive_url": google_drive_url,
-                    "google_drive_file_id": google_drive_file_id,
-                    "updated_at": datetime.utcnow()
-                }
+                    "google_drive_file_id": google_drive_file_id
+                },
+                "$currentDate": {"updated_at": True}
             }
         )
         
@@ -945,7 +1153,7 @@ async def process_tts_job(job_id: str):
         # Send webhook
         job = await db.jobs.find_one({"_id": ObjectId(job_id)})
         full_audio_url = f"{APP_DOMAIN}{audio_url}"
-        await send_webhook(
+        schedule_webhook(
             job_id=job_id,
             name=job["name"],
             audio_url=full_audio_url,
@@ -966,53 +1174,85 @@ async def process_tts_job(job_id: str):
             {
                 "$set": {
                     "status": "failed",
-                    "error": str(e),
-                    "updated_at": datetime.utcnow()
-                }
+                    "error": str(e)
+                },
+                "$currentDate": {"updated_at": True}
             }
         )
 
 
-def tts_chunk_to_audio_sync(client: ElevenLabs, text: str, settings: dict) -> bytes:
-    """Synchronous version of TTS conversion."""
-    voice_settings = settings.get("voice_settings", {})
+async def tts_chunk_async(http_client: httpx.AsyncClient, text: str, settings: dict) -> bytes:
+    """
+    Convert text chunk to audio using the ElevenLabs streaming endpoint.
+    Returns MP3 bytes.
+    """
+    # Identical requests are served from the cache
+    cache_key = tts_cache_key(text, settings)
+    cached = await get_cached_tts_audio(cache_key)
+    if cached is not None:
+        print(f"TTS cache hit: {cache_key}")
+        return cached
     
-    # Build pronunciation dictionary locators if configured
-    pronunciation_dict = settings.get("pronunciation_dictionary")
-    pronunciation_dictionary_locators = None
-    if pronunciation_dict and pronunciation_dict.get("pronunciation_dictionary_id"):
-        locator = PronunciationDictionaryVersionLocator(
-            pronunciation_dictionary_id=pronunciation_dict["pronunciation_dictionary_id"],
-            version_id=pronunciation_dict.get("version_id") or None
-        )
-        pronunciation_dictionary_locators = [locator]
-        print(f"Using pronunciation dictionary: {pronunciation_dict['pronunciation_dictionary_id']}")
+    voice_settings = settings.get("voice_settings", {})
+    voice_id = settings.get("voice_id", ELEVENLABS_VOICE_ID)
     
-    audio_generator = client.text_to_speech.convert(
-        text=text,
-        voice_id=settings.get("voice_id", ELEVENLABS_VOICE_ID),
-        model_id=settings.get("model_id", ELEVENLABS_MODEL),
-        output_format=settings.get("output_format", "mp3_44100_128"),
-        voice_settings={
+    body = {
+        "text": text,
+        "model_id": settings.get("model_id", ELEVENLABS_MODEL),
+        "voice_settings": {
             "stability": voice_settings.get("stability", 0.5),
             "similarity_boost": voice_settings.get("similarity_boost", 1),
             "speed": voice_settings.get("speed", 1.2),
             "style": voice_settings.get("style", 0),
             "use_speaker_boost": voice_settings.get("use_speaker_boost", False)
-        },
-        pronunciation_dictionary_locators=pronunciation_dictionary_locators
-    )
+        }
+    }
     
-    audio_data = b""
-    for chunk in audio_generator:
-        audio_data += chunk
+    # Add pronunciation dictionary locator if configured
+    pronunciation_dict = settings.get("pronunciation_dictionary")
+    if pronunciation_dict and pronunciation_dict.get("pronunciation_dictionary_id"):
+        body["pronunciation_dictionary_locators"] = [{
+            "pronunciation_dictionary_id": pronunciation_dict["pronunciation_dictionary_id"],
+            "version_id": pronunciation_dict.get("version_id") or None
+        }]
+        print(f"Using pronunciation dictionary: {pronunciation_dict['pronunciation_dictionary_id']}")
+    
+    async with http_client.stream(
+        "POST",
+        f"{ELEVENLABS_API_BASE}/v1/text-to-speech/{voice_id}/stream",
+        params={"output_format": settings.get("output_format", "mp3_44100_128")},
+        # identity encoding so the raw network chunks are the MP3 bytes themselves
+        headers={"xi-api-key": ELEVENLABS_API_KEY, "Accept-Encoding": "identity"},
+        json=body
+    ) as response:
+        if response.status_code != 200:
+            error_body = await response.aread()
+            raise RuntimeError(f"TTS API error: {response.status_code} - {error_body.decode(errors='replace')[:500]}")
+        
+        buf = acquire_audio_buffer()
+        size = 0
+        try:
+            async for chunk in response.aiter_raw():
+                end = size + len(chunk)
+                buf[size:end] = chunk
+                size = end
+            audio_data = bytes(memoryview(buf)[:size])
+        finally:
+            release_audio_buffer(buf)
     
+    await store_cached_tts_audio(cache_key, audio_data)
     return audio_data
 
 
-async def tts_chunk_with_retry(eleven_client: ElevenLabs, chunk_text: str, tts_settings: dict, chunk_index: int, job_id: str) -> bytes:
+class ChunkSkipped(Exception):
+    """Raised when a chunk is not started because its job has already failed."""
+
+
+async def tts_chunk_with_retry(http_client: httpx.AsyncClient, chunk_text: str, tts_settings: dict, chunk_index: int, job_id: str, slot=None) -> bytes:
     """
     Process a TTS chunk with automatic retry on failure.
+    Each attempt runs inside slot(attempt) (default: a tts_semaphore slot), which is not
+    held during the backoff sleeps between attempts.
     Returns audio bytes on success, raises exception after all retries exhausted.
     """
     last_error = None
@@ -1023,41 +1263,166 @@ async def tts_chunk_with_retry(eleven_client: ElevenLabs, chunk_text: str, tts_s
                 delay = RETRY_DELAYS[min(attempt - 1, len(RETRY_DELAYS) - 1)]
                 print(f"Retry {attempt}/{MAX_RETRIES} for chunk {chunk_index + 1} of job {job_id} after {delay}s delay...")
                 await asyncio.sleep(delay)
-                
-                # Update chunk status to retrying
-                await db.jobs.update_one(
-                    {"_id": ObjectId(job_id)},
-                    {"$set": {
-                        f"chunk_requests.{chunk_index}.status": "retrying",
-                        f"chunk_requests.{chunk_index}.retry_count": attempt,
-                        "updated_at": datetime.utcnow()
-                    }}
-                )
             
-            audio_data = await asyncio.to_thread(
-                lambda ct=chunk_text, s=tts_settings: tts_chunk_to_audio_sync(eleven_client, ct, s)
-            )
-            return audio_data
+            async with (slot(attempt) if slot else tts_semaphore):
+                if attempt > 0:
+                    # Update chunk status to retrying
+                    await update_job_chunk(job_id, chunk_index, {
+                        "status": "retrying",
+                        "retry_count": attempt
+                    })
+                
+                audio_data = await tts_chunk_async(http_client, chunk_text, tts_settings)
+                return audio_data
             
+        except ChunkSkipped:
+            raise
         except Exception as e:
             last_error = e
             print(f"Chunk {chunk_index + 1} attempt {attempt + 1} failed: {e}")
             
             if attempt < MAX_RETRIES:
                 # Update chunk status with error but continue retrying
-                await db.jobs.update_one(
-                    {"_id": ObjectId(job_id)},
-                    {"$set": {
-                        f"chunk_requests.{chunk_index}.last_error": str(e),
-                        f"chunk_requests.{chunk_index}.retry_count": attempt + 1,
-                        "updated_at": datetime.utcnow()
-                    }}
-                )
+                await update_job_chunk(job_id, chunk_index, {
+                    "last_error": str(e),
+                    "retry_count": attempt + 1
+                })
     
     # All retries exhausted
     raise last_error
 
 
+async def convert_chunks_concurrently(job_id: str, chunks: list[str], indices: list[int], tts_settings: dict, completed: int = 0) -> list[bytes]:
+    """
+    Convert the given chunks to audio in parallel (sharing the process-wide TTS_WORKER_CONCURRENCY limit).
+    Saves each chunk's audio file and records progress as chunks finish; progress writes
+    are batched and flushed every PROGRESS_FLUSH_BATCH updates or PROGRESS_FLUSH_INTERVAL seconds.
+    Returns audio bytes in the order of `indices`. Once any chunk exhausts its retries no new
+    chunks start; those already converting finish and are saved, then the first error is raised.
+    """
+    oid = ObjectId(job_id)
+    chunk_count = len(chunks)
+    
+    # Pending writes: merged $set fields per chunk, plus finished chunks not yet counted on the job
+    pending_chunks: dict[int, dict] = {}
+    pending_done = 0
+    flush_lock = asyncio.Lock()
+    
+    async def write_progress():
+        nonlocal pending_chunks, pending_done
+        async with flush_lock:
+            chunk_fields, pending_chunks = pending_chunks, {}
+            done, pending_done = pending_done, 0
+            if chunk_fields:
+                # One op per chunk, so ordering between them doesn't matter
+                await db.job_chunks.bulk_write([
+                    UpdateOne({"job_id": oid, "chunk_index": i}, {"$set": fields})
+                    for i, fields in chunk_fields.items()
+                ], ordered=False)
+            if done:
+                await db.jobs.update_one(
+                    {"_id": oid},
+                    {
+                        "$inc": {"processed_chunks": done},
+                        "$set": {
+                            "progress": int((completed / chunk_count) * 85),  # 85% for TTS, 15% for merge
+                            "stage": f"Converting to speech ({completed}/{chunk_count})..."
+                        },
+                        "$currentDate": {"updated_at": True}
+                    }
+                )
+    
+    async def flush_progress():
+        # Shielded: once pending writes are swapped out they must reach Mongo even if the caller is cancelled
+        await asyncio.shield(asyncio.ensure_future(write_progress()))
+    
+    async def record_chunk(i: int, fields: dict):
+        pending_chunks.setdefault(i, {}).update(fields)
+        if len(pending_chunks) + pending_done >= PROGRESS_FLUSH_BATCH:
+            await flush_progress()
+    
+    async def flush_periodically():
+        while not stop_flusher.is_set():
+            try:
+                await asyncio.wait_for(stop_flusher.wait(), PROGRESS_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                await flush_progress()
+    
+    async def convert(i: int) -> Optional[bytes]:
+        nonlocal completed, pending_done, first_error
+        
+        @asynccontextmanager
+        async def slot(attempt: int):
+            async with tts_semaphore:
+                # Once a sibling has failed, don't start (or retry) anything new
+                if failed.is_set():
+                    raise ChunkSkipped()
+                if attempt == 0:
+                    print(f"Processing chunk {i + 1}/{chunk_count} for job {job_id}")
+                    await record_chunk(i, {"status": "processing"})
+                yield
+        
+        try:
+            # Use retry wrapper for resilience
+            audio_data = await tts_chunk_with_retry(http_client, chunks[i], tts_settings, i, job_id, slot=slot)
+        except ChunkSkipped:
+            # Never converted; leave it for resume
+            await record_chunk(i, {"status": "pending"})
+            return None
+        except Exception as e:
+            # Set before any await so no waiting chunk can take the freed slot
+            is_first = not failed.is_set()
+            failed.set()
+            # Mark chunk as failed after all retries exhausted
+            pending_chunks.setdefault(i, {}).update({
+                "status": "failed",
+                "error": str(e),
+                "processed_at": datetime.utcnow().isoformat()
+            })
+            await flush_progress()
+            if is_first:
+                first_error = e
+                await db.jobs.update_one(
+                    {"_id": oid},
+                    {"$set": {"failed_at_chunk": i}}  # Track where we failed for resume
+                )
+            print(f"Error processing chunk {i + 1} after {MAX_RETRIES} retries: {e}")
+            raise
+        
+        # Save individual chunk audio file (also when a sibling failed: it is already paid for)
+        chunk_audio_path = os.path.join(STORAGE_DIR, f"{job_id}_chunk_{i}.mp3")
+        with open(chunk_audio_path, "wb") as f:
+            f.write(audio_data)
+        
+        # Record chunk request status and job progress
+        completed += 1
+        pending_done += 1
+        await record_chunk(i, {
+            "status": "completed",
+            "processed_at": datetime.utcnow().isoformat(),
+            "audio_path": chunk_audio_path,
+            "audio_url": f"/api/jobs/{job_id}/chunks/{i}/audio"
+        })
+        return audio_data
+    
+    failed = asyncio.Event()
+    first_error: Optional[Exception] = None
+    stop_flusher = asyncio.Event()
+    flusher = asyncio.create_task(flush_periodically())
+    try:
+        # In-flight chunks run to completion after a failure; unstarted ones are skipped
+        results = await asyncio.gather(*[convert(i) for i in indices], return_exceptions=True)
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            raise first_error or errors[0]
+        return results
+    finally:
+        # Let the flusher finish any write in progress rather than cancelling it mid-flush
+        stop_flusher.set()
+        await asyncio.gather(flusher, return_exceptions=True)
+        await flush_progress()
+
+
 # API Routes
 
 @app.get("/api/health")
@@ -1069,7 +1434,7 @@ async def health_check():
 @app.get("/api/settings")
 async def get_settings():
     """Get current TTS settings."""
-    settings = await get_tts_settings()
+    settings = await get_tts_settings_cached()
     return settings
 
 
@@ -1111,6 +1476,7 @@ async def update_settings(settings: TTSSettings):
         {"$set": settings_dict},
         upsert=True
     )
+    set_settings_cache(settings_dict)
     
     return {"message": "Settings updated successfully", "settings": settings_dict}
 
@@ -1118,6 +1484,7 @@ async def update_settings(settings: TTSSettings):
 @app.patch("/api/settings")
 async def patch_settings(updates: TTSSettingsUpdate):
     """Partially update TTS settings. Only provided fields are updated."""
+    # Read from the database, not the per-worker cache, so a stale copy can't overwrite another worker's update
     current_settings = await get_tts_settings()
     
     # Apply updates
@@ -1160,6 +1527,7 @@ async def patch_settings(updates: TTSSettingsUpdate):
         {"$set": current_settings},
         upsert=True
     )
+    set_settings_cache(current_settings)
     
     return {"message": "Settings updated successfully", "settings": current_settings}
 
@@ -1168,6 +1536,7 @@ async def patch_settings(updates: TTSSettingsUpdate):
 async def reset_settings():
     """Reset TTS settings to defaults."""
     await db.settings.delete_one({"_id": "tts_settings"})
+    set_settings_cache(None)
     return {"message": "Settings reset to defaults", "settings": DEFAULT_TTS_SETTINGS}
 
 
@@ -1175,7 +1544,7 @@ async def reset_settings():
 async def create_job(job_data: JobCreate, background_tasks: BackgroundTasks):
     """Create a new TTS job."""
     # Get current TTS settings
-    tts_settings = await get_tts_settings()
+    tts_settings = await get_tts_settings_cached()
     mode = tts_settings.get("mode", "chunking")
     voice_settings = tts_settings.get("voice_settings", DEFAULT_TTS_SETTINGS["voice_settings"])
     studio_settings = tts_settings.get("studio_settings", DEFAULT_TTS_SETTINGS["studio_settings"])
@@ -1229,16 +1598,12 @@ async def create_job(job_data: JobCreate, background_tasks: BackgroundTasks):
                 "processed_at": None
             })
     
-    # Create job document
-    now = datetime.utcnow()
+    # Create job document (timestamps are stamped by the server on insert)
     job_doc = {
         "name": job_data.name,
         "text_length": len(job_data.text),
-        "original_text": job_data.text,  # Store original text for Studio mode
         "chunk_count": chunk_count,
         "processed_chunks": 0,
-        "chunks": chunks,
-        "chunk_requests": chunk_requests,
         "external_job_id": job_data.external_job_id,
         "files_url": job_data.files_url,
         "callback_data": job_data.callback_data,
@@ -1260,14 +1625,25 @@ async def create_job(job_data: JobCreate, background_tasks: BackgroundTasks):
         "error": None,
         "audio_path": None,
         "audio_url": None,
-        "duration_seconds": None,
-        "created_at": now,
-        "updated_at": now
+        "duration_seconds": None
     }
+    if mode == "studio":
+        # Studio converts the whole text in one project; chunking keeps it only in job_chunks
+        job_doc["original_text"] = job_data.text
     
-    # Insert into database
-    result = await db.jobs.insert_one(job_doc)
-    job_id = str(result.inserted_id)
+    # Insert into database (chunk requests live in their own collection)
+    oid = ObjectId()
+    stamps = await db.jobs.find_one_and_update(
+        {"_id": oid},
+        {"$setOnInsert": job_doc, "$currentDate": {"created_at": True, "updated_at": True}},
+        projection={"created_at": 1, "updated_at": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    job_id = str(oid)
+    for cr in chunk_requests:
+        cr["job_id"] = oid
+    await db.job_chunks.insert_many(chunk_requests)
     
     # Start background processing based on mode
     if mode == "studio":
@@ -1276,7 +1652,7 @@ async def create_job(job_data: JobCreate, background_tasks: BackgroundTasks):
         background_tasks.add_task(process_tts_job, job_id)
     
     # Return response
-    job_doc["_id"] = result.inserted_id
+    job_doc.update(stamps)
     serialized = serialize_doc(job_doc)
     
     return JobResponse(
@@ -1301,11 +1677,11 @@ async def list_jobs(limit: int = 50, skip: int = 0):
     """List all jobs, most recent first."""
     cursor = db.jobs.find(
         {},
-        {"chunks": 0}  # Exclude chunks from list view
+        JOB_LIST_PROJECTION  # Only the fields the list view needs
     ).sort("created_at", -1).skip(skip).limit(limit)
     
     jobs = []
-    async for job in cursor:
+    for job in await cursor.to_list(length=None):
         serialized = serialize_doc(job)
         jobs.append({
             "id": serialized["_id"],
@@ -1323,22 +1699,16 @@ async def list_jobs(limit: int = 50, skip: int = 0):
             "updated_at": serialized["updated_at"]
         })
     
-    # Get total count
-    total = await db.jobs.count_documents({})
+    # Get total count (unfiltered, so collection metadata is enough)
+    total = await db.jobs.estimated_document_count()
     
-    return {"jobs": jobs, "total": total}
+    return ORJSONResponse({"jobs": jobs, "total": total})
 
 
 @app.get("/api/jobs/{job_id}")
-async def get_job(job_id: str):
+async def get_job(oid: ObjectId = Depends(job_oid)):
     """Get a specific job by ID."""
-    try:
-        job = await db.jobs.find_one(
-            {"_id": ObjectId(job_id)},
-            {"chunks": 0}  # Exclude chunks from response
-        )
-    except:
-        raise HTTPException(status_code=400, detail="Invalid job ID")
+    job = await db.jobs.find_one({"_id": oid}, JOB_LIST_PROJECTION)
     
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -1362,19 +1732,17 @@ async def get_job(job_id: str):
 
 
 @app.get("/api/jobs/{job_id}/details")
-async def get_job_details(job_id: str):
+async def get_job_details(oid: ObjectId = Depends(job_oid)):
     """Get full job details including all chunk requests for debugging."""
-    try:
-        job = await db.jobs.find_one({"_id": ObjectId(job_id)})
-    except:
-        raise HTTPException(status_code=400, detail="Invalid job ID")
+    job = await db.jobs.find_one({"_id": oid})
     
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
     serialized = serialize_doc(job)
     
-    return {
+    # Rendered directly by orjson; chunk requests need no per-field conversion
+    return ORJSONResponse({
         "id": serialized["_id"],
         "name": serialized["name"],
         "status": serialized["status"],
@@ -1389,17 +1757,15 @@ async def get_job_details(job_id: str):
         "created_at": serialized["created_at"],
         "updated_at": serialized["updated_at"],
         "tts_config": serialized.get("tts_config"),
-        "chunk_requests": serialized.get("chunk_requests", [])
-    }
+        # Legacy embedded chunk requests are returned as-is; only the job runners migrate them
+        "chunk_requests": job["chunk_requests"] if "chunk_requests" in job else await get_chunk_requests(job)
+    })
 
 
 @app.get("/api/jobs/{job_id}/download")
-async def download_job_audio(job_id: str):
+async def download_job_audio(oid: ObjectId = Depends(job_oid)):
     """Download the audio file for a completed job."""
-    try:
-        job = await db.jobs.find_one({"_id": ObjectId(job_id)})
-    except:
-        raise HTTPException(status_code=400, detail="Invalid job ID")
+    job = await db.jobs.find_one({"_id": oid})
     
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -1408,17 +1774,19 @@ async def download_job_audio(job_id: str):
         raise HTTPException(status_code=400, detail="Job is not completed yet")
     
     audio_path = job.get("audio_path")
-    if not audio_path or not os.path.exists(audio_path):
+    audio_stat = await asyncio.to_thread(stat_regular_file, audio_path) if audio_path else None
+    if not audio_stat:
         raise HTTPException(status_code=404, detail="Audio file not found")
     
     # Sanitize filename
-    safe_name = re.sub(r'[^a-zA-Z0-9_-]', '_', job["name"])[:50]
+    safe_name = _SAFE_NAME_RE.sub('_', job["name"])[:50]
     filename = f"{safe_name}.mp3"
     
-    return FileResponse(
+    return AudioFileResponse(
         path=audio_path,
         media_type="audio/mpeg",
         filename=filename,
+        stat_result=audio_stat,
         headers={
             "Content-Disposition": f'attachment; filename="{filename}"'
         }
@@ -1426,80 +1794,79 @@ async def download_job_audio(job_id: str):
 
 
 @app.get("/api/jobs/{job_id}/chunks/{chunk_index}/audio")
-async def get_chunk_audio(job_id: str, chunk_index: int):
+async def get_chunk_audio(chunk_index: int, oid: ObjectId = Depends(job_oid)):
     """Stream audio for a specific chunk."""
-    try:
-        job = await db.jobs.find_one({"_id": ObjectId(job_id)})
-    except:
-        raise HTTPException(status_code=400, detail="Invalid job ID")
+    job = await db.jobs.find_one({"_id": oid})
     
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    chunk_requests = job.get("chunk_requests", [])
-    if chunk_index < 0 or chunk_index >= len(chunk_requests):
+    if "chunk_requests" in job:
+        # Legacy job with embedded chunk requests
+        chunk_requests = job["chunk_requests"]
+        chunk = chunk_requests[chunk_index] if 0 <= chunk_index < len(chunk_requests) else None
+    else:
+        chunk = await db.job_chunks.find_one({"job_id": job["_id"], "chunk_index": chunk_index})
+    if not chunk:
         raise HTTPException(status_code=404, detail="Chunk not found")
     
-    chunk = chunk_requests[chunk_index]
     audio_path = chunk.get("audio_path")
     
-    if not audio_path or not os.path.exists(audio_path):
+    audio_stat = await asyncio.to_thread(stat_regular_file, audio_path) if audio_path else None
+    if not audio_stat:
         raise HTTPException(status_code=404, detail="Chunk audio file not found")
     
     # Sanitize filename
-    safe_name = re.sub(r'[^a-zA-Z0-9_-]', '_', job["name"])[:30]
+    safe_name = _SAFE_NAME_RE.sub('_', job["name"])[:30]
     filename = f"{safe_name}_chunk_{chunk_index + 1}.mp3"
     
-    return FileResponse(
+    return AudioFileResponse(
         path=audio_path,
         media_type="audio/mpeg",
-        filename=filename
+        filename=filename,
+        stat_result=audio_stat
     )
 
 
 @app.delete("/api/jobs/{job_id}")
-async def delete_job(job_id: str):
+async def delete_job(oid: ObjectId = Depends(job_oid)):
     """Delete a job and its audio files (including chunks)."""
-    try:
-        job = await db.jobs.find_one({"_id": ObjectId(job_id)})
-    except:
-        raise HTTPException(status_code=400, detail="Invalid job ID")
+    job = await db.jobs.find_one({"_id": oid})
     
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
     # Delete main audio file if exists
     audio_path = job.get("audio_path")
-    if audio_path and os.path.exists(audio_path):
-        os.remove(audio_path)
-    
-    # Delete chunk audio files
-    chunk_requests = job.get("chunk_requests", [])
-    for chunk in chunk_requests:
-        chunk_audio_path = chunk.get("audio_path")
-        if chunk_audio_path and os.path.exists(chunk_audio_path):
-            try:
-                os.remove(chunk_audio_path)
-            except:
-                pass  # Ignore errors cleaning up chunk files
+    if audio_path:
+        await asyncio.to_thread(remove_if_exists, audio_path)
+    
+    # Delete chunk audio files in parallel (errors cleaning up chunk files are ignored)
+    if "chunk_requests" in job:
+        # Legacy job with embedded chunk requests (read directly, no need to migrate before deleting)
+        chunk_requests = job["chunk_requests"]
+    else:
+        chunk_requests = await get_chunk_requests(job)
+    await asyncio.gather(*[
+        asyncio.to_thread(remove_quietly, chunk["audio_path"])
+        for chunk in chunk_requests if chunk.get("audio_path")
+    ])
     
     # Delete from database
-    await db.jobs.delete_one({"_id": ObjectId(job_id)})
+    await db.jobs.delete_one({"_id": oid})
+    await db.job_chunks.delete_many({"job_id": oid})
     
     return {"message": "Job deleted successfully"}
 
 
 @app.post("/api/jobs/{job_id}/retry")
-async def retry_job(job_id: str, background_tasks: BackgroundTasks):
+async def retry_job(job_id: str, background_tasks: BackgroundTasks, oid: ObjectId = Depends(job_oid)):
     """
     Retry a failed job from where it left off.
     - For chunking mode: resumes from the first failed/pending chunk
     - For studio mode: restarts the entire job
     """
-    try:
-        job = await db.jobs.find_one({"_id": ObjectId(job_id)})
-    except:
-        raise HTTPException(status_code=400, detail="Invalid job ID")
+    job = await db.jobs.find_one({"_id": oid})
     
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -1513,14 +1880,13 @@ async def retry_job(job_id: str, background_tasks: BackgroundTasks):
     if mode == "studio":
         # For studio mode, restart entirely
         await db.jobs.update_one(
-            {"_id": ObjectId(job_id)},
+            {"_id": oid},
             {"$set": {
                 "status": "queued",
                 "stage": "Retrying...",
                 "progress": 0,
-                "error": None,
-                "updated_at": datetime.utcnow()
-            }}
+                "error": None
+            }, "$currentDate": {"updated_at": True}}
         )
         background_tasks.add_task(process_studio_job, job_id)
         return {"message": "Studio job retry started", "job_id": job_id}
@@ -1540,9 +1906,9 @@ async def resume_tts_job(job_id: str):
             return
         
         tts_settings = job.get("tts_config", DEFAULT_TTS_SETTINGS)
-        chunks = job["chunks"]
+        chunk_requests = await get_chunk_requests(job)
+        chunks = [cr["request"]["text"] for cr in chunk_requests]
         chunk_count = len(chunks)
-        chunk_requests = job.get("chunk_requests", [])
         
         # Find first incomplete chunk
         start_chunk = 0
@@ -1560,15 +1926,13 @@ async def resume_tts_job(job_id: str):
             {"$set": {
                 "status": "transcribing",
                 "stage": f"Resuming from chunk {start_chunk + 1}...",
-                "error": None,
-                "updated_at": datetime.utcnow()
+                "processed_chunks": start_chunk,
+                "error": None
             },
+            "$currentDate": {"updated_at": True},
             "$unset": {"failed_at_chunk": ""}}
         )
         
-        # Initialize ElevenLabs client
-        eleven_client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
-        
         # Load existing audio chunks
         audio_chunks = []
         for i in range(start_chunk):
@@ -1582,78 +1946,32 @@ async def resume_tts_job(job_id: str):
                 audio_chunks = audio_chunks[:i]
                 break
         
-        # Process remaining chunks
-        for i in range(start_chunk, chunk_count):
-            chunk_text = chunks[i]
-            print(f"Processing chunk {i + 1}/{chunk_count} for job {job_id} (resume)")
-            
-            # Update chunk status to processing
+        # Process remaining chunks in parallel
+        try:
+            audio_chunks += await convert_chunks_concurrently(
+                job_id, chunks, list(range(start_chunk, chunk_count)), tts_settings, completed=start_chunk
+            )
+        except Exception as e:
             await db.jobs.update_one(
                 {"_id": ObjectId(job_id)},
-                {"$set": {
-                    f"chunk_requests.{i}.status": "processing",
-                    "updated_at": datetime.utcnow()
-                }}
+                {"$set": {"status": "failed", "error": str(e)}, "$currentDate": {"updated_at": True}}
             )
-            
-            try:
-                audio_data = await tts_chunk_with_retry(eleven_client, chunk_text, tts_settings, i, job_id)
-                audio_chunks.append(audio_data)
-                
-                # Save individual chunk audio file
-                chunk_audio_path = os.path.join(STORAGE_DIR, f"{job_id}_chunk_{i}.mp3")
-                with open(chunk_audio_path, "wb") as f:
-                    f.write(audio_data)
-                
-                # Update progress
-                progress = int(((i + 1) / chunk_count) * 85)
-                await db.jobs.update_one(
-                    {"_id": ObjectId(job_id)},
-                    {
-                        "$set": {
-                            "processed_chunks": i + 1,
-                            "progress": progress,
-                            "stage": f"Converting to speech ({i + 1}/{chunk_count})...",
-                            "updated_at": datetime.utcnow(),
-                            f"chunk_requests.{i}.status": "completed",
-                            f"chunk_requests.{i}.processed_at": datetime.utcnow().isoformat(),
-                            f"chunk_requests.{i}.audio_path": chunk_audio_path,
-                            f"chunk_requests.{i}.audio_url": f"/api/jobs/{job_id}/chunks/{i}/audio"
-                        }
-                    }
-                )
-            except Exception as e:
-                await db.jobs.update_one(
-                    {"_id": ObjectId(job_id)},
-                    {
-                        "$set": {
-                            "status": "failed",
-                            "error": str(e),
-                            f"chunk_requests.{i}.status": "failed",
-                            f"chunk_requests.{i}.error": str(e),
-                            "failed_at_chunk": i,
-                            "updated_at": datetime.utcnow()
-                        }
-                    }
-                )
-                print(f"Resume failed at chunk {i + 1}: {e}")
-                return
+            print(f"Resume failed: {e}")
+            return
         
         # Merge audio chunks
         print(f"Merging {len(audio_chunks)} audio chunks for job {job_id}")
         await db.jobs.update_one(
             {"_id": ObjectId(job_id)},
-            {"$set": {"status": "merging", "stage": "Merging audio chunks...", "progress": 90, "updated_at": datetime.utcnow()}}
-        )
-        
-        merged_audio, duration = await asyncio.to_thread(
-            merge_audio_chunks, audio_chunks
+            {"$set": {"status": "merging", "stage": "Merging audio chunks...", "progress": 90}, "$currentDate": {"updated_at": True}}
         )
         
-        # Save merged file
+        # Merge straight into the job's audio file
         audio_path = os.path.join(STORAGE_DIR, f"{job_id}.mp3")
-        with open(audio_path, "wb") as f:
-            f.write(merged_audio)
+        duration = await asyncio.to_thread(
+            merge_audio_chunks, audio_chunks, audio_path
+        )
+        audio_chunks.clear()
         
         # Upload to Google Drive if folder_id provided
         google_drive_url = None
@@ -1681,9 +1999,9 @@ async def resume_tts_job(job_id: str):
                     "audio_url": audio_url,
                     "duration_seconds": duration,
                     "google_drive_url": google_drive_url,
-                    "google_drive_file_id": google_drive_file_id,
-                    "updated_at": datetime.utcnow()
-                }
+                    "google_drive_file_id": google_drive_file_id
+                },
+                "$currentDate": {"updated_at": True}
             }
         )
         
@@ -1691,7 +2009,7 @@ async def resume_tts_job(job_id: str):
         
         # Send webhook
         full_audio_url = f"{APP_DOMAIN}{audio_url}"
-        await send_webhook(
+        schedule_webhook(
             job_id=job_id,
             name=job["name"],
             audio_url=full_audio_url,
@@ -1711,10 +2029,18 @@ async def resume_tts_job(job_id: str):
         traceback.print_exc()
         await db.jobs.update_one(
             {"_id": ObjectId(job_id)},
-            {"$set": {"status": "failed", "error": str(e), "updated_at": datetime.utcnow()}}
+            {"$set": {"status": "failed", "error": str(e)}, "$currentDate": {"updated_at": True}}
         )
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
+    # Each worker runs its own lifespan, so Mongo/httpx clients and caches are per-process
+    uvicorn.run(
+        "server:app",
+        host="0.0.0.0",
+        port=8001,
+        loop="uvloop",
+        http="httptools",
+        workers=WEB_CONCURRENCY
+    )
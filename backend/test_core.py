@@ -11,8 +11,10 @@ import os
 import re
 import httpx
 from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
 from pydub import AudioSegment
 from elevenlabs import ElevenLabs
+from mp3_frames import scan_mp3_frames
 
 # Configuration
 ELEVENLABS_API_KEY = "sk_e80ab01e82f120260468d7955899f07b10ef028fdbc6a564"
@@ -21,6 +23,12 @@ MODEL_ID = "eleven_multilingual_v2"  # ElevenLabs v3 model
 WEBHOOK_URL = "https://drshumard.app.n8n.cloud/webhook/cb298a5c-abcf-4596-bec3-e457f0798790"
 MAX_CHUNK_SIZE = 10000  # 10,000 characters max per TTS request
 
+# Sentence boundaries: . ! ? followed by whitespace
+_SENT_SPLIT = re.compile(r'(?<=[.!?])\s+')
+
+# Reused for every webhook call (keep-alive, no new TLS handshake per call)
+webhook_client = httpx.Client(timeout=10.0)
+
 # Storage
 STORAGE_DIR = "/app/backend/storage"
 os.makedirs(STORAGE_DIR, exist_ok=True)
@@ -32,11 +40,12 @@ def split_text_into_chunks(text: str, max_chars: int = MAX_CHUNK_SIZE) -> list[s
     Sentence boundaries: . ! ? followed by space or newline
     """
     # Split on sentence boundaries but keep the delimiter
-    sentence_pattern = r'(?<=[.!?])\s+'
-    sentences = re.split(sentence_pattern, text)
+    sentences = _SENT_SPLIT.split(text)
     
     chunks = []
-    current_chunk = ""
+    # Build each chunk as a list of parts plus a running length; join once on flush
+    cur_parts: list[str] = []
+    cur_len = 0
     
     for sentence in sentences:
         sentence = sentence.strip()
@@ -44,33 +53,34 @@ def split_text_into_chunks(text: str, max_chars: int = MAX_CHUNK_SIZE) -> list[s
             continue
             
         # If adding this sentence exceeds max, save current chunk and start new
-        if len(current_chunk) + len(sentence) + 1 > max_chars:
-            if current_chunk:
-                chunks.append(current_chunk.strip())
+        if cur_len + len(sentence) + 1 > max_chars:
+            if cur_parts:
+                chunks.append(" ".join(cur_parts))
             
             # If a single sentence exceeds max_chars, we need to split it
             if len(sentence) > max_chars:
                 # Split at word boundaries
-                words = sentence.split()
-                current_chunk = ""
-                for word in words:
-                    if len(current_chunk) + len(word) + 1 > max_chars:
-                        if current_chunk:
-                            chunks.append(current_chunk.strip())
-                        current_chunk = word
+                cur_parts = []
+                cur_len = 0
+                for word in sentence.split():
+                    if cur_len + len(word) + 1 > max_chars:
+                        if cur_parts:
+                            chunks.append(" ".join(cur_parts))
+                        cur_parts = [word]
+                        cur_len = len(word)
                     else:
-                        current_chunk = f"{current_chunk} {word}".strip()
+                        cur_len += len(word) + (1 if cur_parts else 0)
+                        cur_parts.append(word)
             else:
-                current_chunk = sentence
+                cur_parts = [sentence]
+                cur_len = len(sentence)
         else:
-            if current_chunk:
-                current_chunk = f"{current_chunk} {sentence}"
-            else:
-                current_chunk = sentence
+            cur_len += len(sentence) + (1 if cur_parts else 0)
+            cur_parts.append(sentence)
     
     # Don't forget the last chunk
-    if current_chunk:
-        chunks.append(current_chunk.strip())
+    if cur_parts:
+        chunks.append(" ".join(cur_parts))
     
     return chunks
 
@@ -91,44 +101,54 @@ def tts_chunk_to_audio(client: ElevenLabs, text: str) -> bytes:
     )
     
     # Collect all audio bytes from generator
-    audio_data = b""
+    parts: list[bytes] = []
     for chunk in audio_generator:
-        audio_data += chunk
+        parts.append(chunk)
+    audio_data = b"".join(parts)
     
     print(f"  -> Received {len(audio_data)} bytes of audio")
     return audio_data
 
 
-def merge_audio_chunks(audio_chunks: list[bytes]) -> bytes:
+def _decode_mp3(chunk_bytes: bytes) -> AudioSegment:
+    """Decode one MP3 chunk (runs in a worker process)."""
+    return AudioSegment.from_mp3(BytesIO(chunk_bytes))
+
+
+def merge_audio_chunks(audio_chunks: list[bytes], output_path: str) -> float:
     """
-    Merge multiple MP3 audio chunks into a single MP3 file.
+    Merge multiple MP3 audio chunks into a single MP3 file at output_path.
     Uses pydub for proper audio concatenation.
+    Returns the duration in seconds.
     """
     print(f"\n[MERGE] Combining {len(audio_chunks)} audio chunks...")
     
-    combined = None
+    if not audio_chunks:
+        raise ValueError("No audio chunks to merge")
+    
+    # Decode all chunks in parallel, one ffmpeg decode per CPU core
+    workers = min(os.cpu_count() or 1, len(audio_chunks))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        segments = list(executor.map(_decode_mp3, audio_chunks))
     
-    for i, chunk_bytes in enumerate(audio_chunks):
-        print(f"  -> Processing chunk {i + 1}/{len(audio_chunks)}")
-        
-        # Load audio segment from bytes
-        segment = AudioSegment.from_mp3(BytesIO(chunk_bytes))
-        
-        if combined is None:
-            combined = segment
-        else:
+    first = segments[0]
+    if all((s.frame_rate, s.sample_width, s.channels) == (first.frame_rate, first.sample_width, first.channels)
+           for s in segments):
+        # Same PCM format: join the raw frames once instead of copying on every "+"
+        combined = first._spawn(b"".join(s._data for s in segments))
+    else:
+        # Mixed formats: let pydub convert each segment as it appends
+        combined = first
+        for i, segment in enumerate(segments[1:], start=2):
+            print(f"  -> Converting chunk {i}/{len(segments)}")
             combined = combined + segment
     
-    if combined is None:
-        raise ValueError("No audio chunks to merge")
-    
-    # Export to MP3 bytes
-    output_buffer = BytesIO()
-    combined.export(output_buffer, format="mp3", bitrate="128k")
-    output_buffer.seek(0)
+    # Export straight to the output file
+    combined.export(output_path, format="mp3", bitrate="128k")
     
-    print(f"  -> Final duration: {len(combined) / 1000:.2f} seconds")
-    return output_buffer.read()
+    duration = len(combined) / 1000
+    print(f"  -> Final duration: {duration:.2f} seconds")
+    return duration
 
 
 def send_webhook(job_id: str, name: str, audio_url: str, status: str, text_len: int, chunk_count: int) -> bool:
@@ -147,7 +167,7 @@ def send_webhook(job_id: str, name: str, audio_url: str, status: str, text_len:
     }
     
     try:
-        response = httpx.post(WEBHOOK_URL, json=payload, timeout=10.0)
+        response = webhook_client.post(WEBHOOK_URL, json=payload)
         print(f"  -> Status: {response.status_code}")
         print(f"  -> Response: {response.text[:200] if response.text else 'empty'}")
         return response.status_code in (200, 201, 202, 204)
@@ -198,28 +218,33 @@ def run_poc():
     
     # Step 4: Merge audio chunks
     print("\n[STEP 4] Merging audio chunks...")
+    chunk_total = len(audio_chunks)
+    output_path = os.path.join(STORAGE_DIR, "poc_combined.mp3")
     try:
-        final_audio = merge_audio_chunks(audio_chunks)
-        print(f"  -> Final audio size: {len(final_audio)} bytes")
+        merge_audio_chunks(audio_chunks, output_path)
+        audio_chunks.clear()
     except Exception as e:
         print(f"  -> ERROR merging: {e}")
         raise
     
-    # Step 5: Save to file
-    output_path = os.path.join(STORAGE_DIR, "poc_combined.mp3")
-    print(f"\n[STEP 5] Saving to {output_path}...")
-    with open(output_path, "wb") as f:
-        f.write(final_audio)
-    print(f"  -> Saved! File size: {os.path.getsize(output_path)} bytes")
+    # Step 5: Check saved file
+    final_size = os.path.getsize(output_path)
+    print(f"\n[STEP 5] Saved to {output_path}")
+    print(f"  -> File size: {final_size} bytes")
     
-    # Verify audio is valid
+    # Verify every MPEG frame parses, back to back, through to the end of the file
     try:
-        audio = AudioSegment.from_mp3(output_path)
-        print(f"  -> Audio duration: {len(audio) / 1000:.2f} seconds")
-        print(f"  -> Channels: {audio.channels}")
-        print(f"  -> Sample rate: {audio.frame_rate} Hz")
+        with open(output_path, "rb") as f:
+            info = scan_mp3_frames(f.read())
+        if info is None:
+            raise ValueError("MPEG frames are missing or corrupt")
+        _, _, sample_rate, mono, _ = info["format"]
+        print(f"  -> MPEG frames: {info['frames']}")
+        print(f"  -> Audio duration: {info['duration']:.2f} seconds")
+        print(f"  -> Channels: {1 if mono else 2}")
+        print(f"  -> Sample rate: {sample_rate} Hz")
     except Exception as e:
-        print(f"  -> WARNING: Could not verify audio: {e}")
+        print(f"  -> WARNING: Could not verify MPEG frames: {e}")
     
     # Step 6: Test webhook
     print("\n[STEP 6] Testing webhook delivery...")
@@ -237,8 +262,8 @@ def run_poc():
     print("POC RESULTS:")
     print("=" * 60)
     print(f"  ✓ Text chunking: {len(chunks)} chunks created")
-    print(f"  ✓ TTS conversion: {len(audio_chunks)} audio segments")
-    print(f"  ✓ Audio merge: {len(final_audio)} bytes")
+    print(f"  ✓ TTS conversion: {chunk_total} audio segments")
+    print(f"  ✓ Audio merge: {final_size} bytes")
     print(f"  ✓ File saved: {output_path}")
     print(f"  {'✓' if webhook_success else '✗'} Webhook: {'delivered' if webhook_success else 'failed'}")
     print("=" * 60)